@@ -27,6 +27,7 @@ from datetime import datetime
 OUTPUT_FILE = os.path.join(os.path.dirname(__file__), "nhanes_biomarker_baselines.json")
 
 AGE_GROUPS = ["18-29", "30-39", "40-49", "50-59", "60-69", "70+"]
+SEXES = ["male", "female"]
 
 BIOMARKER_DISTRIBUTIONS = {
     "total_cholesterol": {
@@ -240,22 +241,61 @@ BIOMARKER_DISTRIBUTIONS = {
 }
 
 
-def generate_percentiles(mean: float, std: float) -> dict:
-    """Generate percentiles from normal distribution parameters."""
-    return {
-        "p5": round(mean - 1.645 * std, 3),
-        "p10": round(mean - 1.282 * std, 3),
-        "p25": round(mean - 0.674 * std, 3),
-        "p50": round(mean, 3),
-        "p75": round(mean + 0.674 * std, 3),
-        "p90": round(mean + 1.282 * std, 3),
-        "p95": round(mean + 1.645 * std, 3),
-    }
+# Standard normal quantiles for the reported percentiles
+PERCENTILE_LABELS = ("p5", "p10", "p25", "p50", "p75", "p90", "p95")
+PERCENTILE_Z = np.array([-1.645, -1.282, -0.674, 0.0, 0.674, 1.282, 1.645])
+
+
+def _round(values, ndigits: int) -> np.ndarray:
+    """Vectorized round() with builtin semantics.
+    
+    np.round scales by 10**ndigits before rounding, so it can disagree with
+    round() on decimal ties such as 7.8575; those few values fall back to round().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, ndigits)
+    scaled = values * 10.0 ** ndigits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    rounded[near_tie] = [round(v, ndigits) for v in values[near_tie].tolist()]
+    return rounded
+
+
+def generate_percentiles(mean, std) -> list:
+    """Generate percentiles from normal distribution parameters.
+    
+    Accepts scalars or arrays; returns (nested) lists with the values for
+    PERCENTILE_LABELS on the innermost axis.
+    """
+    mean = np.asarray(mean, dtype=np.float64)[..., None]
+    std = np.asarray(std, dtype=np.float64)[..., None]
+    return _round(mean + PERCENTILE_Z * std, 3).tolist()
 
 
 def generate_baselines() -> dict:
     """Generate population baselines from medical literature distributions."""
     
+    configs = list(BIOMARKER_DISTRIBUTIONS.values())
+    sex_dists = [[config.get("by_sex", {}).get(sex, config["global"]) for sex in SEXES] for config in configs]
+    age_dists = [[config.get("by_age", {}).get(age_group, config["global"]) for age_group in AGE_GROUPS] for config in configs]
+    
+    # Pack every stratum into (biomarker, ...) arrays so percentiles are computed
+    # once per level instead of once per cell
+    glob_mean = np.array([config["global"]["mean"] for config in configs], dtype=np.float64)
+    glob_std = np.array([config["global"]["std"] for config in configs], dtype=np.float64)
+    sex_mean = np.array([[d["mean"] for d in row] for row in sex_dists], dtype=np.float64)
+    sex_std = np.array([[d["std"] for d in row] for row in sex_dists], dtype=np.float64)
+    age_mean = np.array([[d["mean"] for d in row] for row in age_dists], dtype=np.float64)
+    age_std = np.array([[d["std"] for d in row] for row in age_dists], dtype=np.float64)
+    combined_mean = (age_mean[:, :, None] + sex_mean[:, None, :]) / 2
+    combined_std = (age_std[:, :, None] + sex_std[:, None, :]) / 2
+    
+    glob_pct = generate_percentiles(glob_mean, glob_std)
+    sex_pct = generate_percentiles(sex_mean, sex_std)
+    age_pct = generate_percentiles(age_mean, age_std)
+    combined_pct = generate_percentiles(combined_mean, combined_std)
+    combined_mean_rounded = _round(combined_mean, 3).tolist()
+    combined_std_rounded = _round(combined_std, 3).tolist()
+    
     baselines = {
         "global": {},
         "by_sex": {"male": {}, "female": {}},
@@ -267,10 +307,8 @@ def generate_baselines() -> dict:
         baselines["by_age_group"][age_group] = {}
         baselines["by_age_and_sex"][age_group] = {"male": {}, "female": {}}
     
-    for biomarker, config in BIOMARKER_DISTRIBUTIONS.items():
+    for i, (biomarker, config) in enumerate(BIOMARKER_DISTRIBUTIONS.items()):
         glob = config["global"]
-        percentiles = generate_percentiles(glob["mean"], glob["std"])
-        
         baselines["global"][biomarker] = {
             "mean": glob["mean"],
             "std": glob["std"],
@@ -278,38 +316,33 @@ def generate_baselines() -> dict:
             "max": glob.get("max", glob["mean"] + 3 * glob["std"]),
             "unit": config["unit"],
             "n": 5000,
-            **percentiles
+            **dict(zip(PERCENTILE_LABELS, glob_pct[i]))
         }
         
-        for sex in ["male", "female"]:
-            sex_dist = config.get("by_sex", {}).get(sex, glob)
-            percentiles = generate_percentiles(sex_dist["mean"], sex_dist["std"])
+        for s, sex in enumerate(SEXES):
+            sex_dist = sex_dists[i][s]
             baselines["by_sex"][sex][biomarker] = {
                 "mean": sex_dist["mean"],
                 "std": sex_dist["std"],
                 "n": 2500,
-                **percentiles
+                **dict(zip(PERCENTILE_LABELS, sex_pct[i][s]))
             }
         
-        for age_group in AGE_GROUPS:
-            age_dist = config.get("by_age", {}).get(age_group, glob)
-            percentiles = generate_percentiles(age_dist["mean"], age_dist["std"])
+        for a, age_group in enumerate(AGE_GROUPS):
+            age_dist = age_dists[i][a]
             baselines["by_age_group"][age_group][biomarker] = {
                 "mean": age_dist["mean"],
                 "std": age_dist["std"],
                 "n": 800,
-                **percentiles
+                **dict(zip(PERCENTILE_LABELS, age_pct[i][a]))
             }
             
-            for sex in ["male", "female"]:
-                combined_mean = (age_dist["mean"] + config.get("by_sex", {}).get(sex, glob)["mean"]) / 2
-                combined_std = (age_dist["std"] + config.get("by_sex", {}).get(sex, glob)["std"]) / 2
-                percentiles = generate_percentiles(combined_mean, combined_std)
+            for s, sex in enumerate(SEXES):
                 baselines["by_age_and_sex"][age_group][sex][biomarker] = {
-                    "mean": round(combined_mean, 3),
-                    "std": round(combined_std, 3),
+                    "mean": combined_mean_rounded[i][a][s],
+                    "std": combined_std_rounded[i][a][s],
                     "n": 400,
-                    **percentiles
+                    **dict(zip(PERCENTILE_LABELS, combined_pct[i][a][s]))
                 }
     
     return baselines
@@ -336,8 +369,9 @@ def main():
         "metadata": {biomarker: {"unit": config["unit"]} for biomarker, config in BIOMARKER_DISTRIBUTIONS.items()}
     }
     
+    # Encode in one pass and write once; json.dump issues a write per token
     with open(OUTPUT_FILE, "w") as f:
-        json.dump(output, f, indent=2)
+        f.write(json.dumps(output, indent=2))
     
     print("=" * 60)
     print("SUCCESS!")
@@ -17,30 +17,33 @@ Output: JSON file with glucose readings that can be injected into ClickHouse
 import json
 import sys
 import os
-import random
+import math
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Tuple, TYPE_CHECKING
 import numpy as np
-import pandas as pd
 
-from simglucose.simulation.env import T1DSimEnv
-from simglucose.controller.base import Controller, Action
-from simglucose.sensor.cgm import CGMSensor
-from simglucose.actuator.pump import InsulinPump
-from simglucose.patient.t1dpatient import T1DPatient
-from simglucose.simulation.scenario import CustomScenario
-from simglucose.simulation.scenario_gen import RandomScenario
+# simglucose is imported where it's used so --help and plain imports stay fast
+if TYPE_CHECKING:
+    from simglucose.simulation.scenario import CustomScenario
 
 
-class SimpleBasalController(Controller):
-    """Simple controller that provides constant basal insulin."""
+class SimpleBasalController:
+    """Simple controller that provides constant basal insulin.
+    
+    Implements simglucose's Controller interface (policy/reset) without
+    subclassing it, so the module loads without importing simglucose.
+    """
     
     def __init__(self, basal_rate: float = 0.5):
+        from simglucose.controller.base import Action
+        
         self.basal_rate = basal_rate
+        self._action = Action(basal=basal_rate, bolus=0)
     
     def policy(self, observation, reward, done, **kwargs):
         """Return constant basal rate, no bolus."""
-        return Action(basal=self.basal_rate, bolus=0)
+        return self._action
     
     def reset(self):
         pass
@@ -53,294 +56,445 @@ PATIENTS = [
 
 CGM_SENSORS = ['Dexcom', 'GuardianRT', 'Navigator']
 
-def create_meal_scenario(start_time: datetime, scenario_type: str = 'normal') -> CustomScenario:
+TREND_LABELS = ['stable', 'rising', 'rising_fast', 'falling', 'falling_fast']
+RANGE_LABELS = ['severe_hypo', 'hypo', 'normal', 'hyper', 'severe_hyper']
+
+# Exclusive upper bound for simulation seeds (CGMSensor seeds a legacy RandomState)
+SEED_BOUND = 2 ** 31
+
+# (hour, carbs) meals per scenario
+MEAL_SCENARIOS = {
+    'normal': ((7, 45), (12, 70), (18, 80)),
+    'high_carb': ((7, 80), (10, 30), (12, 120), (15, 40), (18, 100), (21, 25)),
+    'low_carb': ((8, 20), (13, 35), (19, 40)),
+    'skipped_meals': ((7, 50), (19, 90)),
+    'exercise_day': ((6, 60), (11, 50), (14, 30), (18, 70)),
+}
+DEFAULT_MEALS = ((7, 50), (12, 60), (18, 70))
+
+def create_meal_scenario(
+    start_time: datetime,
+    scenario_type: str = 'normal',
+    rng: np.random.Generator = None
+) -> 'CustomScenario':
     """Create different meal scenarios for diverse training data."""
+    from simglucose.simulation.scenario import CustomScenario
     
-    if scenario_type == 'normal':
-        meals = [
-            (7, 45),
-            (12, 70),
-            (18, 80),
-        ]
-    elif scenario_type == 'high_carb':
-        meals = [
-            (7, 80),
-            (10, 30),
-            (12, 120),
-            (15, 40),
-            (18, 100),
-            (21, 25),
-        ]
-    elif scenario_type == 'low_carb':
-        meals = [
-            (8, 20),
-            (13, 35),
-            (19, 40),
-        ]
-    elif scenario_type == 'skipped_meals':
-        meals = [
-            (7, 50),
-            (19, 90),
-        ]
-    elif scenario_type == 'exercise_day':
-        meals = [
-            (6, 60),
-            (11, 50),
-            (14, 30),
-            (18, 70),
-        ]
-    else:
-        meals = [(7, 50), (12, 60), (18, 70)]
+    meals = MEAL_SCENARIOS.get(scenario_type, DEFAULT_MEALS)
     
-    meal_times = []
-    meal_amounts = []
-    for hour, carbs in meals:
-        meal_time = start_time.replace(hour=hour, minute=random.randint(0, 30))
-        meal_times.append(meal_time)
-        meal_amounts.append(carbs + random.randint(-10, 10))
+    rng = rng or np.random.default_rng()
+    minutes = rng.integers(0, 31, size=len(meals)).tolist()
+    offsets = rng.integers(-10, 11, size=len(meals)).tolist()
+    meal_times = [start_time.replace(hour=hour, minute=minute) for (hour, _), minute in zip(meals, minutes)]
+    meal_amounts = [carbs + offset for (_, carbs), offset in zip(meals, offsets)]
     
     return CustomScenario(start_time=start_time, scenario=list(zip(meal_times, meal_amounts)))
 
 
+def _get_extractors(step_result) -> Tuple[Callable[[Any], float], Callable[[Any], bool]]:
+    """Resolve the simulator's step result layout once, outside the step loop."""
+    if hasattr(step_result, 'observation') and hasattr(step_result.observation, 'CGM'):
+        get_cgm = lambda sr: float(sr.observation.CGM)
+    elif hasattr(step_result, 'CGM'):
+        get_cgm = lambda sr: float(sr.CGM)
+    else:
+        get_cgm = lambda sr: math.nan
+    
+    if hasattr(step_result, 'done'):
+        get_done = lambda sr: sr.done
+    else:
+        get_done = lambda sr: False
+    
+    return get_cgm, get_done
+
+
 def run_simulation(
     patient_name: str,
     days: int = 7,
     scenario_type: str = 'normal',
     seed: int = None
-) -> List[Dict[str, Any]]:
-    """Run a single patient simulation and return glucose readings."""
+) -> Dict[str, Any]:
+    """Run a single patient simulation and return glucose readings as column arrays."""
+    from simglucose.actuator.pump import InsulinPump
+    from simglucose.patient.t1dpatient import T1DPatient
+    from simglucose.sensor.cgm import CGMSensor
+    from simglucose.simulation.env import T1DSimEnv
     
     if seed is None:
-        seed = random.randint(1, 10000)
+        seed = int(np.random.default_rng().integers(1, SEED_BOUND))
+    # Private RNG so concurrent workers don't share (or fork) global random state
+    rng = np.random.default_rng(seed)
     
     patient = T1DPatient.withName(patient_name)
-    sensor = CGMSensor.withName(random.choice(CGM_SENSORS), seed=seed)
+    sensor = CGMSensor.withName(CGM_SENSORS[rng.integers(len(CGM_SENSORS))], seed=seed)
     pump = InsulinPump.withName('Insulet')
     
     start_time = datetime.now() - timedelta(days=days)
-    scenario = create_meal_scenario(start_time, scenario_type)
+    scenario = create_meal_scenario(start_time, scenario_type, rng)
     
-    controller = SimpleBasalController(basal_rate=random.uniform(0.3, 0.8))
+    controller = SimpleBasalController(basal_rate=float(rng.uniform(0.3, 0.8)))
     
     env = T1DSimEnv(patient, sensor, pump, scenario)
     
-    readings = []
     step_result = env.reset()
+    get_cgm, get_done = _get_extractors(step_result)
     
     steps_per_day = 288
     total_steps = days * steps_per_day
     
-    current_time = start_time
+    # At most one reading per step; filled up to n and trimmed after the loop
+    raw_glucose = np.empty(total_steps, dtype=np.float64)
+    steps = np.empty(total_steps, dtype=np.int64)
+    n = 0
+    
+    # Sensor noise for every step in one batched draw
+    noise = rng.normal(0.0, 2.0, size=total_steps)
     
     for sim_step in range(total_steps):
         action = controller.policy(step_result, reward=0, done=False)
         
         step_result = env.step(action)
+        glucose_value = get_cgm(step_result)
         
-        if hasattr(step_result, 'observation') and hasattr(step_result.observation, 'CGM'):
-            glucose_value = float(step_result.observation.CGM)
-        elif hasattr(step_result, 'CGM'):
-            glucose_value = float(step_result.CGM)
-        else:
-            continue
-        
-        done = step_result.done if hasattr(step_result, 'done') else False
-        
-        if not np.isnan(glucose_value) and glucose_value > 0:
-            glucose_value += random.gauss(0, 2)
-            glucose_value = max(40, min(400, glucose_value))
-            
-            readings.append({
-                'glucose_mg_dl': round(glucose_value, 1),
-                'glucose_mmol_l': round(glucose_value / 18.0182, 2),
-                'timestamp': current_time.isoformat(),
-                'patient_type': patient_name.split('#')[0],
-                'scenario': scenario_type,
-                'source': 'simglucose_synthetic',
-                'trend': calculate_trend(readings),
-            })
-        
-        current_time += timedelta(minutes=5)
+        if not math.isnan(glucose_value) and glucose_value > 0:
+            raw_glucose[n] = glucose_value
+            steps[n] = sim_step
+            n += 1
         
-        step_done = step_result.done if hasattr(step_result, 'done') else False
-        if step_done:
+        if get_done(step_result):
             break
     
-    return readings
+    steps = steps[:n]
+    glucose = np.clip(raw_glucose[:n] + noise[steps], 40, 400)
+    glucose_mg_dl = np.round(glucose, 1)
+    glucose_mmol_l = np.round(glucose / 18.0182, 2)
+    # Readings are 5 minutes apart by step, including steps skipped for bad sensor values
+    timestamps = np.datetime64(start_time, 'us') + steps * np.timedelta64(5, 'm')
+    
+    return {
+        'patient_type': patient_name.split('#')[0],
+        'scenario': scenario_type,
+        'glucose_mg_dl': glucose_mg_dl,
+        'glucose_mmol_l': glucose_mmol_l,
+        'timestamp': timestamps,
+        'trend': trend_labels(glucose_mg_dl),
+    }
 
 
-def calculate_trend(readings: List[Dict], window: int = 3) -> str:
-    """Calculate glucose trend based on recent readings."""
-    if len(readings) < window:
-        return 'stable'
-    
-    recent = [r['glucose_mg_dl'] for r in readings[-window:]]
-    delta = recent[-1] - recent[0]
-    rate = delta / (window * 5)
-    
-    if rate > 3:
-        return 'rising_fast'
-    elif rate > 1:
-        return 'rising'
-    elif rate < -3:
-        return 'falling_fast'
-    elif rate < -1:
-        return 'falling'
-    else:
-        return 'stable'
+def trend_labels(glucose: np.ndarray, window: int = 3) -> np.ndarray:
+    """Trend code (index into TREND_LABELS) for each reading.
+    
+    Each reading's trend comes from the rate of change (mg/dL per minute)
+    across the `window` readings before it: above 3 is rising_fast, above 1
+    rising, below -3 falling_fast, below -1 falling, otherwise stable. The
+    first `window` readings are stable.
+    """
+    codes = np.zeros(glucose.size, dtype=np.int8)
+    rate = (glucose[window - 1:-1] - glucose[:-window]) / (window * 5)
+    codes[window:] = np.select([rate > 3, rate > 1, rate < -3, rate < -1], [2, 1, 4, 3], default=0)
+    return codes
 
 
-def classify_glucose(value: float) -> Dict[str, Any]:
-    """Classify glucose value and identify if it's an anomaly."""
+def classify_glucose(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """Classify an array of glucose values and flag anomalies, column-wise.
+    
+    'range_label' holds int8 codes indexing RANGE_LABELS.
+    """
+    is_hypo = values < 70
+    is_severe_hypo = values < 54
+    is_hyper = values > 180
+    is_severe_hyper = values > 250
+    
+    # Each threshold crossed moves one band up from severe_hypo
+    range_code = (~is_severe_hypo).astype(np.int8)
+    range_code += ~is_hypo
+    range_code += is_hyper
+    range_code += is_severe_hyper
     
-    classification = {
-        'is_hypo': value < 70,
-        'is_severe_hypo': value < 54,
-        'is_hyper': value > 180,
-        'is_severe_hyper': value > 250,
-        'is_in_range': 70 <= value <= 180,
-        'range_label': 'normal'
+    return {
+        'is_hypo': is_hypo,
+        'is_severe_hypo': is_severe_hypo,
+        'is_hyper': is_hyper,
+        'is_severe_hyper': is_severe_hyper,
+        'is_in_range': ~is_hypo & ~is_hyper,
+        'range_label': range_code,
     }
+
+
+def _simulate_patient(patient_name: str, days: int, scenario_type: str, seed: int) -> Dict[str, Any]:
+    """Simulate and classify one patient; runs in a worker process."""
+    readings = run_simulation(
+        patient_name=patient_name,
+        days=days,
+        scenario_type=scenario_type,
+        seed=seed
+    )
+    readings.update(classify_glucose(readings['glucose_mg_dl']))
+    return readings
+
+
+def _empty_readings() -> Dict[str, Any]:
+    """Zero-length readings with the same columns and dtypes as _simulate_patient."""
+    glucose = np.empty(0, dtype=np.float64)
+    readings = {
+        'patient_type': '',
+        'scenario': '',
+        'glucose_mg_dl': glucose,
+        'glucose_mmol_l': glucose,
+        'timestamp': np.empty(0, dtype='datetime64[us]'),
+        'trend': trend_labels(glucose),
+    }
+    readings.update(classify_glucose(glucose))
+    return readings
+
+
+def _isoformat(timestamps: np.ndarray) -> List[str]:
+    """datetime.isoformat() for a datetime64[us] array.
+    
+    Like isoformat(), microseconds are omitted when zero; readings share the
+    simulation start's microseconds, so one unit fits the whole array.
+    """
+    unit = 'us' if np.any(timestamps.astype(np.int64) % 1_000_000) else 's'
+    return np.datetime_as_string(timestamps, unit=unit).tolist()
+
+
+def readings_to_records(readings: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Materialize a patient's column arrays as one dict per reading."""
+    patient_type = readings['patient_type']
+    scenario = readings['scenario']
+    columns = zip(
+        readings['glucose_mg_dl'].tolist(),
+        readings['glucose_mmol_l'].tolist(),
+        _isoformat(readings['timestamp']),
+        [TREND_LABELS[code] for code in readings['trend'].tolist()],
+        readings['is_hypo'].tolist(),
+        readings['is_severe_hypo'].tolist(),
+        readings['is_hyper'].tolist(),
+        readings['is_severe_hyper'].tolist(),
+        readings['is_in_range'].tolist(),
+        [RANGE_LABELS[code] for code in readings['range_label'].tolist()],
+    )
     
-    if value < 54:
-        classification['range_label'] = 'severe_hypo'
-    elif value < 70:
-        classification['range_label'] = 'hypo'
-    elif value <= 180:
-        classification['range_label'] = 'normal'
-    elif value <= 250:
-        classification['range_label'] = 'hyper'
-    else:
-        classification['range_label'] = 'severe_hyper'
-    
-    return classification
+    return [{
+        'glucose_mg_dl': mg_dl,
+        'glucose_mmol_l': mmol_l,
+        'timestamp': timestamp,
+        'patient_type': patient_type,
+        'scenario': scenario,
+        'source': 'simglucose_synthetic',
+        'trend': trend,
+        'is_hypo': hypo,
+        'is_severe_hypo': severe_hypo,
+        'is_hyper': hyper,
+        'is_severe_hyper': severe_hyper,
+        'is_in_range': in_range,
+        'range_label': label,
+    } for mg_dl, mmol_l, timestamp, trend, hypo, severe_hypo, hyper, severe_hyper, in_range, label in columns]
 
 
 def generate_training_dataset(
     num_patients: int = 5,
     days_per_patient: int = 7,
-    output_file: str = None
+    output_file: str = None,
+    output_format: str = 'json',
+    seed: int = None
 ) -> Dict[str, Any]:
-    """Generate a comprehensive training dataset with diverse scenarios."""
+    """Generate a comprehensive training dataset with diverse scenarios.
+    
+    `seed` drives patient, scenario and per-patient simulation seeds, so a
+    fixed seed reproduces the whole dataset.
+    
+    The per-reading 'readings' list is only built when writing `output_file`
+    as JSON; 'parquet' and 'jsonl' write the readings on their own and the
+    rest of the dataset to a JSON sidecar (see write_parquet, write_jsonl).
+    """
     
-    scenarios = ['normal', 'high_carb', 'low_carb', 'skipped_meals', 'exercise_day']
-    selected_patients = random.sample(PATIENTS, min(num_patients, len(PATIENTS)))
+    rng = np.random.default_rng(seed)
+    count = min(num_patients, len(PATIENTS))
+    selected_patients = rng.choice(PATIENTS, size=count, replace=False).tolist()
+    
+    # Draw scenarios and seeds up front so runs don't depend on worker scheduling
+    tasks = list(zip(
+        selected_patients,
+        rng.choice(list(MEAL_SCENARIOS), size=count).tolist(),
+        rng.integers(1, SEED_BOUND, size=count).tolist(),
+    ))
     
-    all_readings = []
     patient_summaries = []
     
-    for patient in selected_patients:
-        scenario = random.choice(scenarios)
+    for patient, scenario, _ in tasks:
         print(f"Simulating {patient} with {scenario} scenario for {days_per_patient} days...", file=sys.stderr)
-        
-        readings = run_simulation(
-            patient_name=patient,
-            days=days_per_patient,
-            scenario_type=scenario
-        )
-        
-        for reading in readings:
-            reading.update(classify_glucose(reading['glucose_mg_dl']))
-        
-        all_readings.extend(readings)
-        
-        glucose_values = [r['glucose_mg_dl'] for r in readings]
+    
+    max_workers = max(1, min(len(tasks), os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_simulate_patient, patient, days_per_patient, scenario, seed)
+            for patient, scenario, seed in tasks
+        ]
+        results = [future.result() for future in futures]
+    
+    for (patient, scenario, _), readings in zip(tasks, results):
+        glucose = readings['glucose_mg_dl']
+        in_range = int(np.count_nonzero((glucose >= 70) & (glucose <= 180)))
         patient_summaries.append({
             'patient': patient,
             'scenario': scenario,
-            'readings_count': len(readings),
-            'mean_glucose': round(np.mean(glucose_values), 1),
-            'std_glucose': round(np.std(glucose_values), 1),
-            'min_glucose': round(min(glucose_values), 1),
-            'max_glucose': round(max(glucose_values), 1),
-            'time_in_range': round(sum(1 for v in glucose_values if 70 <= v <= 180) / len(glucose_values) * 100, 1),
-            'hypo_events': sum(1 for v in glucose_values if v < 70),
-            'hyper_events': sum(1 for v in glucose_values if v > 180),
+            'readings_count': int(glucose.size),
+            'mean_glucose': round(float(glucose.mean()), 1),
+            'std_glucose': round(float(glucose.std()), 1),
+            'min_glucose': round(float(glucose.min()), 1),
+            'max_glucose': round(float(glucose.max()), 1),
+            'time_in_range': round(in_range / glucose.size * 100, 1),
+            'hypo_events': int(np.count_nonzero(glucose < 70)),
+            'hyper_events': int(np.count_nonzero(glucose > 180)),
         })
     
-    anomaly_patterns = identify_patterns(all_readings)
+    # np.concatenate needs at least one array, so a run with no patients uses empty columns
+    columns = results or [_empty_readings()]
+    anomaly_patterns = identify_patterns(
+        np.concatenate([readings['glucose_mg_dl'] for readings in columns]),
+        np.concatenate([readings['timestamp'] for readings in columns]),
+    )
     
     dataset = {
         'generated_at': datetime.now().isoformat(),
-        'total_readings': len(all_readings),
+        'total_readings': sum(summary['readings_count'] for summary in patient_summaries),
         'patients_simulated': len(selected_patients),
         'days_per_patient': days_per_patient,
         'patient_summaries': patient_summaries,
         'anomaly_patterns': anomaly_patterns,
-        'readings': all_readings,
     }
     
-    if output_file:
+    if output_file and output_format in ('parquet', 'jsonl'):
+        writer = write_parquet if output_format == 'parquet' else write_jsonl
+        sidecar = writer(results, dataset, output_file)
+        print(f"Dataset saved to {output_file} (summaries in {sidecar})", file=sys.stderr)
+    elif output_file:
+        # Per-reading dicts are only needed for the JSON file
+        dataset['readings'] = [record for readings in results for record in readings_to_records(readings)]
+        # Compact separators keep json on its C encoder (indent forces the pure-Python one)
         with open(output_file, 'w') as f:
-            json.dump(dataset, f, indent=2)
+            f.write(json.dumps(dataset, separators=(',', ':')))
         print(f"Dataset saved to {output_file}", file=sys.stderr)
     
     return dataset
 
 
-def identify_patterns(readings: List[Dict]) -> Dict[str, Any]:
+def _write_sidecar(dataset: Dict[str, Any], output_file: str) -> str:
+    """Write the dataset (without readings) next to `output_file`; returns its path."""
+    sidecar = os.path.splitext(output_file)[0] + '_summary.json'
+    with open(sidecar, 'w') as f:
+        f.write(json.dumps(dataset, separators=(',', ':')))
+    return sidecar
+
+
+def write_jsonl(results: List[Dict[str, Any]], dataset: Dict[str, Any], output_file: str) -> str:
+    """Write readings as newline-delimited JSON and the summaries to a JSON sidecar.
+    
+    Records are materialized one patient at a time, so peak memory stays at
+    the column arrays plus a single patient's dicts. Returns the sidecar path.
+    """
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+    with open(output_file, 'w') as f:
+        for readings in results:
+            f.writelines(encode(record) + '\n' for record in readings_to_records(readings))
+    return _write_sidecar(dataset, output_file)
+
+
+def write_parquet(results: List[Dict[str, Any]], dataset: Dict[str, Any], output_file: str) -> str:
+    """Write readings to a ZSTD Parquet file and the summaries to a JSON sidecar.
+    
+    Repeated strings (patient type, scenario, source, trend, range label) are
+    dictionary-encoded. pyarrow is only needed for this output format.
+    Returns the sidecar path (`<output stem>_summary.json`).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    # A run with no patients still writes a file with the full schema
+    results = results or [_empty_readings()]
+    counts = [readings['glucose_mg_dl'].size for readings in results]
+    
+    def column(key):
+        return np.concatenate([readings[key] for readings in results])
+    
+    def repeated(key):
+        return pa.array(np.repeat([readings[key] for readings in results], counts)).dictionary_encode()
+    
+    table = pa.table({
+        'glucose_mg_dl': column('glucose_mg_dl'),
+        'glucose_mmol_l': column('glucose_mmol_l'),
+        'timestamp': pa.array(column('timestamp'), type=pa.timestamp('us')),
+        'patient_type': repeated('patient_type'),
+        'scenario': repeated('scenario'),
+        'source': pa.DictionaryArray.from_arrays(
+            np.zeros(sum(counts), dtype=np.int8), ['simglucose_synthetic']
+        ),
+        'trend': pa.DictionaryArray.from_arrays(column('trend'), TREND_LABELS),
+        'is_hypo': column('is_hypo'),
+        'is_severe_hypo': column('is_severe_hypo'),
+        'is_hyper': column('is_hyper'),
+        'is_severe_hyper': column('is_severe_hyper'),
+        'is_in_range': column('is_in_range'),
+        'range_label': pa.DictionaryArray.from_arrays(column('range_label'), RANGE_LABELS),
+    })
+    pq.write_table(table, output_file, compression='zstd')
+    return _write_sidecar(dataset, output_file)
+
+
+def identify_patterns(glucose: np.ndarray, timestamps: np.ndarray) -> Dict[str, Any]:
     """Identify glucose patterns for ML training."""
     
-    patterns = {
-        'hypo_events': [],
-        'hyper_events': [],
-        'rapid_changes': [],
-        'dawn_phenomenon': [],
-        'nocturnal_hypos': [],
-    }
-    
-    for i, reading in enumerate(readings):
-        ts = datetime.fromisoformat(reading['timestamp'])
-        glucose = reading['glucose_mg_dl']
-        
-        if glucose < 70:
-            patterns['hypo_events'].append({
-                'timestamp': reading['timestamp'],
-                'glucose': glucose,
-                'severity': 'severe' if glucose < 54 else 'moderate',
-                'hour': ts.hour,
-            })
-            
-            if 0 <= ts.hour <= 6:
-                patterns['nocturnal_hypos'].append({
-                    'timestamp': reading['timestamp'],
-                    'glucose': glucose,
-                })
-        
-        if glucose > 180:
-            patterns['hyper_events'].append({
-                'timestamp': reading['timestamp'],
-                'glucose': glucose,
-                'severity': 'severe' if glucose > 250 else 'moderate',
-                'hour': ts.hour,
-            })
-        
-        if 4 <= ts.hour <= 8 and glucose > 140:
-            patterns['dawn_phenomenon'].append({
-                'timestamp': reading['timestamp'],
-                'glucose': glucose,
-            })
-        
-        if i >= 3:
-            prev_glucose = readings[i-3]['glucose_mg_dl']
-            delta = abs(glucose - prev_glucose)
-            if delta > 30:
-                patterns['rapid_changes'].append({
-                    'timestamp': reading['timestamp'],
-                    'glucose': glucose,
-                    'delta': delta,
-                    'direction': 'rising' if glucose > prev_glucose else 'falling',
-                })
+    hours = (timestamps.astype('datetime64[h]').astype(np.int64) % 24).astype(np.int8)
+    
+    hypo_mask = glucose < 70
+    hyper_mask = glucose > 180
+    dawn_mask = (hours >= 4) & (hours <= 8) & (glucose > 140)
+    nocturnal_mask = hypo_mask & (hours <= 6)
+    
+    hypo_idx = np.flatnonzero(hypo_mask)
+    hyper_idx = np.flatnonzero(hyper_mask)
+    rapid_idx = np.flatnonzero(np.abs(glucose[3:] - glucose[:-3]) > 30) + 3
+    
+    hypo_sample = hypo_idx[:10]
+    sample_hypos = [{
+        'timestamp': timestamp,
+        'glucose': value,
+        'severity': 'severe' if value < 54 else 'moderate',
+        'hour': hour,
+    } for timestamp, value, hour in zip(
+        _isoformat(timestamps[hypo_sample]), glucose[hypo_sample].tolist(), hours[hypo_sample].tolist()
+    )]
+    
+    hyper_sample = hyper_idx[:10]
+    sample_hypers = [{
+        'timestamp': timestamp,
+        'glucose': value,
+        'severity': 'severe' if value > 250 else 'moderate',
+        'hour': hour,
+    } for timestamp, value, hour in zip(
+        _isoformat(timestamps[hyper_sample]), glucose[hyper_sample].tolist(), hours[hyper_sample].tolist()
+    )]
+    
+    rapid_sample = rapid_idx[:10]
+    sample_rapid_changes = [{
+        'timestamp': timestamp,
+        'glucose': value,
+        'delta': abs(value - previous),
+        'direction': 'rising' if value > previous else 'falling',
+    } for timestamp, value, previous in zip(
+        _isoformat(timestamps[rapid_sample]), glucose[rapid_sample].tolist(), glucose[rapid_sample - 3].tolist()
+    )]
     
     return {
-        'hypo_count': len(patterns['hypo_events']),
-        'hyper_count': len(patterns['hyper_events']),
-        'rapid_change_count': len(patterns['rapid_changes']),
-        'dawn_phenomenon_count': len(patterns['dawn_phenomenon']),
-        'nocturnal_hypo_count': len(patterns['nocturnal_hypos']),
-        'sample_hypos': patterns['hypo_events'][:10],
-        'sample_hypers': patterns['hyper_events'][:10],
-        'sample_rapid_changes': patterns['rapid_changes'][:10],
+        'hypo_count': int(hypo_idx.size),
+        'hyper_count': int(hyper_idx.size),
+        'rapid_change_count': int(rapid_idx.size),
+        'dawn_phenomenon_count': int(np.count_nonzero(dawn_mask)),
+        'nocturnal_hypo_count': int(np.count_nonzero(nocturnal_mask)),
+        'sample_hypos': sample_hypos,
+        'sample_hypers': sample_hypers,
+        'sample_rapid_changes': sample_rapid_changes,
     }
 
 
@@ -352,6 +506,9 @@ if __name__ == '__main__':
     parser.add_argument('--days', type=int, default=7, help='Days per patient')
     parser.add_argument('--output', type=str, default='synthetic_cgm_data.json', help='Output file path')
     parser.add_argument('--summary-only', action='store_true', help='Only output summary stats')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for a reproducible dataset')
+    parser.add_argument('--format', choices=['json', 'jsonl', 'parquet'], default='json',
+                        help='Output file format (parquet requires pyarrow)')
     
     args = parser.parse_args()
     
@@ -360,7 +517,9 @@ if __name__ == '__main__':
     dataset = generate_training_dataset(
         num_patients=args.patients,
         days_per_patient=args.days,
-        output_file=args.output if not args.summary_only else None
+        output_file=args.output if not args.summary_only else None,
+        output_format=args.format,
+        seed=args.seed
     )
     
     if args.summary_only:
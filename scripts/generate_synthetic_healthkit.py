@@ -21,11 +21,12 @@ References:
 - Ohayon et al. (2017) - Sleep duration meta-analysis
 """
 
+import hashlib
 import json
 import os
 import sys
 from datetime import datetime, timedelta
-import random
+from functools import lru_cache
 import math
 
 import numpy as np
@@ -154,205 +155,294 @@ DAY_PATTERNS = {
     },
 }
 
+# Spread of personal baseline offsets: HRV, resting HR, sleep, activity
+PERSONAL_OFFSET_STD = [0.15, 0.10, 0.10, 0.15]
+
+# Demographic levels; a person's position in each list is their code in the tables below
+AGE_GROUPS = ["18-29", "30-39", "40-49", "50-59", "60-69", "70+"]
+SEXES = ["male", "female"]
+ACTIVITY_LEVELS = ["sedentary", "moderate", "active", "athletic"]
+
+
+def _param_table(params: dict, *levels: list) -> np.ndarray:
+    """(mean, std) pairs of a POPULATION_PARAMS entry, indexed by level codes.
+    
+    E.g. _param_table(POPULATION_PARAMS["hrv_sdnn"], AGE_GROUPS, SEXES)[age, sex]
+    is [mean, std] for that age group and sex.
+    """
+    if not levels:
+        return np.array([params["mean"], params["std"]], dtype=np.float64)
+    return np.stack([_param_table(params[level], *levels[1:]) for level in levels[0]])
+
+
+_HRV_SDNN = _param_table(POPULATION_PARAMS["hrv_sdnn"], AGE_GROUPS, SEXES)
+_RESTING_HR = _param_table(POPULATION_PARAMS["resting_hr"], ACTIVITY_LEVELS)
+_SLEEP_DURATION = _param_table(POPULATION_PARAMS["sleep_duration"], AGE_GROUPS)
+_DAILY_STEPS = _param_table(POPULATION_PARAMS["daily_steps"], ACTIVITY_LEVELS)
+_ACTIVE_CALORIES = _param_table(POPULATION_PARAMS["active_calories"], ACTIVITY_LEVELS)
+# Sleep stage fractions drawn per night (core sleep is the remainder) and their floors
+_SLEEP_STAGES = _param_table(POPULATION_PARAMS["sleep_stages"], ["deep", "rem", "awake"])
+_SLEEP_STAGE_MIN = np.array([0.05, 0.10, 0.02])
+
+# Patterns as arrays, indexed by hour of day / weekday (also by arrays of them)
+_HR_CIRCADIAN = np.array(CIRCADIAN_PATTERNS["heart_rate"])
+_HRV_CIRCADIAN = np.array(CIRCADIAN_PATTERNS["hrv"])
+_STEPS_BY_WEEKDAY = np.array([DAY_PATTERNS["steps_multiplier"][day] for day in range(7)])
+_SLEEP_BY_WEEKDAY = np.array([DAY_PATTERNS["sleep_multiplier"][day] for day in range(7)])
+
+# Percentiles reported by the population baselines
+STAT_QUANTILES = [0.05, 0.10, 0.25, 0.75, 0.90, 0.95]
+STAT_QUANTILE_LABELS = ["p5", "p10", "p25", "p75", "p90", "p95"]
+
+# Hours of the hourly heart rate/HRV samples (morning, noon, evening, night)
+HOURLY_SAMPLE_HOURS = [7, 12, 18, 22]
+
+# Hours drawn per day: the daily reading first, then the hourly samples
+_HEART_RATE_HOURS = np.array([7] + HOURLY_SAMPLE_HOURS)
+_HRV_HOURS = np.array([3] + HOURLY_SAMPLE_HOURS)
+
+
+def _noisy_metric(rng: np.random.Generator, params: np.ndarray, offset: float, multiplier,
+                  noise_scale: float, lo: float, hi: float = None):
+    """Personal baseline times a circadian/weekday multiplier, plus noise, clipped.
+    
+    `params` is a population (mean, std) pair from a _param_table. The baseline
+    is the mean shifted by the person's `offset`; noise is Gaussian with
+    `noise_scale` times the std. `multiplier` may be a scalar or an array, and
+    one value is drawn per element.
+    """
+    mean, std = params
+    base = mean * (1 + offset)
+    noise = rng.normal(0, std * noise_scale, size=np.shape(multiplier) or None)
+    return np.clip(base * multiplier + noise, lo, hi)
+
 
 class VirtualPerson:
     """Represents a virtual person with consistent characteristics."""
     
     def __init__(self, person_id: int, age_group: str = None, sex: str = None, 
-                 activity_level: str = None):
+                 activity_level: str = None, rng: np.random.Generator = None):
         self.person_id = person_id
+        # All randomness comes from one generator shared across the population
+        self.rng = rng or np.random.default_rng()
         
         # Assign demographics if not specified
-        self.age_group = age_group or random.choice(
-            ["18-29", "30-39", "40-49", "50-59", "60-69", "70+"]
-        )
-        self.sex = sex or random.choice(["male", "female"])
-        self.activity_level = activity_level or random.choices(
-            ["sedentary", "moderate", "active", "athletic"],
-            weights=[0.25, 0.40, 0.25, 0.10]
-        )[0]
+        self.age_group = age_group or AGE_GROUPS[self.rng.integers(len(AGE_GROUPS))]
+        self.sex = sex or SEXES[self.rng.integers(len(SEXES))]
+        self.activity_level = activity_level or ACTIVITY_LEVELS[self.rng.choice(
+            len(ACTIVITY_LEVELS),
+            p=[0.25, 0.40, 0.25, 0.10]
+        )]
+        
+        # Codes into the population parameter tables
+        self.age_idx = AGE_GROUPS.index(self.age_group)
+        self.sex_idx = SEXES.index(self.sex)
+        self.activity_idx = ACTIVITY_LEVELS.index(self.activity_level)
         
-        # Personal baseline offsets (individual variation)
-        self.hrv_offset = np.random.normal(0, 0.15)  # +/- 15% individual variation
-        self.hr_offset = np.random.normal(0, 0.10)
-        self.sleep_offset = np.random.normal(0, 0.10)
-        self.activity_offset = np.random.normal(0, 0.15)
+        # Population (mean, std) for this person's groups, looked up once
+        self._hrv_params = _HRV_SDNN[self.age_idx, self.sex_idx]
+        self._resting_hr_params = _RESTING_HR[self.activity_idx]
+        self._sleep_params = _SLEEP_DURATION[self.age_idx]
+        self._steps_params = _DAILY_STEPS[self.activity_idx]
+        self._calories_params = _ACTIVE_CALORIES[self.activity_idx]
+        
+        # Personal baseline offsets (individual variation), e.g. +/- 15% for HRV
+        self.hrv_offset, self.hr_offset, self.sleep_offset, self.activity_offset = (
+            self.rng.normal(0, PERSONAL_OFFSET_STD).tolist()
+        )
         
         # Sleep schedule
-        self.typical_bedtime = random.gauss(22.5, 1.0)  # 10:30 PM +/- 1hr
-        self.wake_variation = random.gauss(0, 0.5)
+        self.typical_bedtime = self.rng.normal(22.5, 1.0)  # 10:30 PM +/- 1hr
+        self.wake_variation = self.rng.normal(0, 0.5)
         
-    def get_hrv(self, hour: int) -> float:
-        """Generate HRV value for given hour."""
-        params = POPULATION_PARAMS["hrv_sdnn"][self.age_group][self.sex]
-        base = params["mean"] * (1 + self.hrv_offset)
-        circadian = CIRCADIAN_PATTERNS["hrv"][hour]
-        noise = np.random.normal(0, params["std"] * 0.5)
-        return max(10, base * circadian + noise)
-    
-    def get_resting_hr(self, hour: int) -> float:
-        """Generate resting heart rate for given hour."""
-        params = POPULATION_PARAMS["resting_hr"][self.activity_level]
-        base = params["mean"] * (1 + self.hr_offset)
-        circadian = CIRCADIAN_PATTERNS["heart_rate"][hour]
-        noise = np.random.normal(0, params["std"] * 0.3)
-        return max(40, min(100, base * circadian + noise))
-    
-    def get_sleep_duration(self, day_of_week: int) -> float:
-        """Generate sleep duration for given day."""
-        params = POPULATION_PARAMS["sleep_duration"][self.age_group]
-        base = params["mean"] * (1 + self.sleep_offset)
-        weekend = DAY_PATTERNS["sleep_multiplier"][day_of_week]
-        noise = np.random.normal(0, params["std"] * 0.3)
-        return max(3, min(12, base * weekend + noise))
-    
-    def get_sleep_stages(self, total_sleep_hours: float) -> dict:
-        """Generate sleep stage breakdown."""
-        stages = {}
-        total_mins = total_sleep_hours * 60
+    def get_hrv(self, hour):
+        """Generate HRV value(s) for given hour(s); accepts an int or array."""
+        return _noisy_metric(self.rng, self._hrv_params, self.hrv_offset, _HRV_CIRCADIAN[hour], 0.5, 10)
+    
+    def get_resting_hr(self, hour):
+        """Generate resting heart rate(s) for given hour(s); accepts an int or array."""
+        return _noisy_metric(self.rng, self._resting_hr_params, self.hr_offset, _HR_CIRCADIAN[hour], 0.3, 40, 100)
+    
+    def get_sleep_duration(self, day_of_week):
+        """Generate sleep duration(s) for given day(s) of week."""
+        return _noisy_metric(self.rng, self._sleep_params, self.sleep_offset, _SLEEP_BY_WEEKDAY[day_of_week], 0.3, 3, 12)
+    
+    def get_sleep_stages(self, total_sleep_hours) -> tuple:
+        """Generate (deep, rem, core, awake) minutes for one or more nights."""
+        shape = np.shape(total_sleep_hours)
+        expand = (slice(None),) + (None,) * len(shape)  # stage axis first, then nights
         
-        # Generate stage percentages
-        deep_pct = max(0.05, np.random.normal(
-            POPULATION_PARAMS["sleep_stages"]["deep"]["mean"],
-            POPULATION_PARAMS["sleep_stages"]["deep"]["std"]
-        ))
-        rem_pct = max(0.10, np.random.normal(
-            POPULATION_PARAMS["sleep_stages"]["rem"]["mean"],
-            POPULATION_PARAMS["sleep_stages"]["rem"]["std"]
-        ))
-        awake_pct = max(0.02, np.random.normal(
-            POPULATION_PARAMS["sleep_stages"]["awake"]["mean"],
-            POPULATION_PARAMS["sleep_stages"]["awake"]["std"]
-        ))
+        # Deep, REM and awake fractions in one draw; core sleep is the remainder
+        deep_pct, rem_pct, awake_pct = np.maximum(
+            _SLEEP_STAGE_MIN[expand],
+            self.rng.normal(_SLEEP_STAGES[:, 0][expand], _SLEEP_STAGES[:, 1][expand], size=(3,) + shape)
+        )
         core_pct = 1.0 - deep_pct - rem_pct - awake_pct
         
-        stages["deep_minutes"] = total_mins * deep_pct
-        stages["rem_minutes"] = total_mins * rem_pct
-        stages["core_minutes"] = total_mins * core_pct
-        stages["awake_minutes"] = total_mins * awake_pct
-        
-        return stages
-    
-    def get_daily_steps(self, day_of_week: int) -> int:
-        """Generate daily step count."""
-        params = POPULATION_PARAMS["daily_steps"][self.activity_level]
-        base = params["mean"] * (1 + self.activity_offset)
-        day_effect = DAY_PATTERNS["steps_multiplier"][day_of_week]
-        noise = np.random.normal(0, params["std"] * 0.5)
-        return max(500, int(base * day_effect + noise))
-    
-    def get_active_calories(self, day_of_week: int) -> float:
-        """Generate active calories burned."""
-        params = POPULATION_PARAMS["active_calories"][self.activity_level]
-        base = params["mean"] * (1 + self.activity_offset)
-        day_effect = DAY_PATTERNS["steps_multiplier"][day_of_week]
-        noise = np.random.normal(0, params["std"] * 0.4)
-        return max(50, base * day_effect + noise)
-    
-    def get_respiratory_rate(self) -> float:
-        """Generate respiratory rate."""
+        total_mins = np.multiply(total_sleep_hours, 60)
+        return total_mins * deep_pct, total_mins * rem_pct, total_mins * core_pct, total_mins * awake_pct
+    
+    def get_daily_steps(self, day_of_week):
+        """Generate daily step count(s) for given day(s) of week."""
+        # Clipping before truncation is the same as max(500, int(value))
+        steps = _noisy_metric(self.rng, self._steps_params, self.activity_offset, _STEPS_BY_WEEKDAY[day_of_week], 0.5, 500)
+        return steps.astype(np.int64)
+    
+    def get_active_calories(self, day_of_week):
+        """Generate active calories burned for given day(s) of week."""
+        return _noisy_metric(self.rng, self._calories_params, self.activity_offset, _STEPS_BY_WEEKDAY[day_of_week], 0.4, 50)
+    
+    def get_respiratory_rate(self, size=None):
+        """Generate respiratory rate(s); `size` draws several at once."""
         params = POPULATION_PARAMS["respiratory_rate"]["normal"]
-        return max(8, min(22, np.random.normal(params["mean"], params["std"])))
+        return np.clip(self.rng.normal(params["mean"], params["std"], size=size), 8, 22)
     
-    def get_spo2(self) -> float:
-        """Generate blood oxygen saturation."""
+    def get_spo2(self, size=None):
+        """Generate blood oxygen saturation(s); `size` draws several at once."""
         params = POPULATION_PARAMS["spo2"]["healthy"]
-        value = np.random.normal(params["mean"], params["std"])
-        return max(params["min"], min(params["max"], value))
+        value = self.rng.normal(params["mean"], params["std"], size=size)
+        return np.clip(value, params["min"], params["max"])
     
-    def get_distance(self, steps: int) -> float:
-        """Generate walking/running distance based on steps."""
+    def get_distance(self, steps):
+        """Generate walking/running distance(s) based on steps."""
         # Average stride length varies by height/sex
         stride_m = 0.75 if self.sex == "female" else 0.78
-        stride_m *= np.random.uniform(0.9, 1.1)  # Individual variation
+        stride_m = stride_m * self.rng.uniform(0.9, 1.1, size=np.shape(steps) or None)  # Individual variation
         return (steps * stride_m) / 1000  # Convert to km
 
 
+@lru_cache(maxsize=None)
+def _calendar(start_date: datetime, days: int) -> tuple:
+    """Date strings and weekdays for `days` days from `start_date`.
+    
+    The same for every person, so computed once; the arrays are read-only.
+    """
+    dates = np.array([(start_date + timedelta(days=day_offset)).strftime("%Y-%m-%d") for day_offset in range(days)])
+    day_of_week = (np.arange(days) + start_date.weekday()) % 7
+    dates.flags.writeable = False
+    day_of_week.flags.writeable = False
+    return dates, day_of_week
+
+
 def generate_person_data(person: VirtualPerson, start_date: datetime, 
-                         days: int) -> list:
-    """Generate daily health data for a virtual person."""
-    records = []
-    
-    for day_offset in range(days):
-        current_date = start_date + timedelta(days=day_offset)
-        day_of_week = current_date.weekday()
+                         days: int) -> dict:
+    """Generate daily health data for a virtual person as column arrays.
+    
+    Each metric is drawn for all days in one call and rounded as reported.
+    Keys follow the record layout (see columns_to_records); the hourly
+    samples are (days, len(HOURLY_SAMPLE_HOURS)) arrays.
+    """
+    dates, day_of_week = _calendar(start_date, days)
+    
+    # Generate daily metrics
+    sleep_hours = person.get_sleep_duration(day_of_week)
+    deep_minutes, rem_minutes, core_minutes, awake_minutes = person.get_sleep_stages(sleep_hours)
+    daily_steps = person.get_daily_steps(day_of_week)
+    
+    # Column 0 is the daily reading (resting HR in the morning, HRV at
+    # night/rest), the rest are the hourly samples; one draw per metric
+    heart_rate = np.round(person.get_resting_hr(np.broadcast_to(_HEART_RATE_HOURS, (days, len(_HEART_RATE_HOURS)))), 1)
+    hrv = np.round(person.get_hrv(np.broadcast_to(_HRV_HOURS, (days, len(_HRV_HOURS)))), 1)
+    
+    return {
+        "person_id": np.full(days, f"synthetic_{person.person_id}"),
+        "date": dates,
+        "age_group": np.full(days, person.age_group),
+        "sex": np.full(days, person.sex),
+        "activity_level": np.full(days, person.activity_level),
         
-        # Generate daily metrics
-        sleep_hours = person.get_sleep_duration(day_of_week)
-        sleep_stages = person.get_sleep_stages(sleep_hours)
-        daily_steps = person.get_daily_steps(day_of_week)
+        # Daily aggregates
+        "sleep_duration_hours": np.round(sleep_hours, 2),
+        "deep_sleep_minutes": np.round(deep_minutes, 1),
+        "rem_sleep_minutes": np.round(rem_minutes, 1),
+        "core_sleep_minutes": np.round(core_minutes, 1),
+        "awake_minutes": np.round(awake_minutes, 1),
         
-        record = {
-            "person_id": f"synthetic_{person.person_id}",
-            "date": current_date.strftime("%Y-%m-%d"),
-            "age_group": person.age_group,
-            "sex": person.sex,
-            "activity_level": person.activity_level,
-            
-            # Daily aggregates
-            "sleep_duration_hours": round(sleep_hours, 2),
-            "deep_sleep_minutes": round(sleep_stages["deep_minutes"], 1),
-            "rem_sleep_minutes": round(sleep_stages["rem_minutes"], 1),
-            "core_sleep_minutes": round(sleep_stages["core_minutes"], 1),
-            "awake_minutes": round(sleep_stages["awake_minutes"], 1),
-            
-            "daily_steps": daily_steps,
-            "active_calories": round(person.get_active_calories(day_of_week), 1),
-            "distance_km": round(person.get_distance(daily_steps), 2),
-            
-            "respiratory_rate": round(person.get_respiratory_rate(), 1),
-            "spo2": round(person.get_spo2(), 1),
-            
-            # Resting heart rate (morning average)
-            "resting_heart_rate": round(person.get_resting_hr(7), 1),
-            
-            # HRV (typically measured at night/rest)
-            "hrv_sdnn": round(person.get_hrv(3), 1),
-        }
+        "daily_steps": daily_steps,
+        "active_calories": np.round(person.get_active_calories(day_of_week), 1),
+        "distance_km": np.round(person.get_distance(daily_steps), 2),
         
-        # Generate hourly heart rate samples for a few hours
-        hourly_hr = []
-        for hour in [7, 12, 18, 22]:  # Morning, noon, evening, night
-            hourly_hr.append({
-                "hour": hour,
-                "heart_rate": round(person.get_resting_hr(hour), 1),
-                "hrv": round(person.get_hrv(hour), 1),
-            })
-        record["hourly_samples"] = hourly_hr
+        "respiratory_rate": np.round(person.get_respiratory_rate(days), 1),
+        "spo2": np.round(person.get_spo2(days), 1),
         
-        records.append(record)
+        # Resting heart rate (morning average)
+        "resting_heart_rate": heart_rate[:, 0],
+        
+        # HRV (typically measured at night/rest)
+        "hrv_sdnn": hrv[:, 0],
+        
+        # Hourly heart rate samples for a few hours, one row per day
+        "hourly_heart_rate": heart_rate[:, 1:],
+        "hourly_hrv": hrv[:, 1:],
+    }
+
+
+def columns_to_records(data: dict) -> list:
+    """Materialize column arrays as the per-day record dicts written to JSON."""
+    daily_keys = [key for key in data if not key.startswith("hourly_")]
+    rows = zip(*(data[key].tolist() for key in daily_keys))
+    hourly = zip(data["hourly_heart_rate"].tolist(), data["hourly_hrv"].tolist())
     
+    records = []
+    for row, (heart_rates, hrvs) in zip(rows, hourly):
+        record = dict(zip(daily_keys, row))
+        record["hourly_samples"] = [
+            {"hour": hour, "heart_rate": heart_rate, "hrv": hrv}
+            for hour, heart_rate, hrv in zip(HOURLY_SAMPLE_HOURS, heart_rates, hrvs)
+        ]
+        records.append(record)
     return records
 
 
-def compute_population_baselines(all_data: list) -> dict:
-    """Compute statistical baselines from generated data."""
-    df = pd.DataFrame(all_data)
+def _grouped_stats(grouped) -> dict:
+    """Baseline statistics for every group and metric of a DataFrame GroupBy.
+    
+    Each statistic (n, mean, population std, median, percentiles, min, max)
+    is one vectorized GroupBy reduction over all groups and metrics. Groups
+    with fewer than 5 values get None. Returns {group: {metric: stats or None}}.
+    """
+    count = grouped.count()
+    groups, metrics = list(count.index), list(count.columns)
+    columns = {
+        "mean": grouped.mean().to_numpy(),
+        "std": grouped.std(ddof=0).to_numpy(),  # population std, like np.std
+        "median": grouped.median().to_numpy(),
+    }
+    # quantile() rows are (group, q) pairs, q varying fastest
+    quantiles = grouped.quantile(STAT_QUANTILES).to_numpy().reshape(len(groups), len(STAT_QUANTILES), len(metrics))
+    for i, label in enumerate(STAT_QUANTILE_LABELS):
+        columns[label] = quantiles[:, i, :]
+    columns["min"] = grouped.min().to_numpy()
+    columns["max"] = grouped.max().to_numpy()
+    count = count.to_numpy()
+    
+    result = {}
+    for g, group in enumerate(groups):
+        result[group] = {}
+        for m, metric in enumerate(metrics):
+            if count[g, m] < 5:
+                result[group][metric] = None
+                continue
+            result[group][metric] = {"n": int(count[g, m])}
+            result[group][metric].update((key, float(values[g, m])) for key, values in columns.items())
+    return result
+
+
+def _overall_stats(frame: pd.DataFrame) -> dict:
+    """_grouped_stats over all rows of `frame` as a single group: {column: stats or None}."""
+    return _grouped_stats(frame.groupby(np.zeros(len(frame), dtype=np.int8)))[0]
+
+
+def compute_population_baselines(data: dict) -> dict:
+    """Compute statistical baselines from generated column data."""
+    df = pd.DataFrame({key: values for key, values in data.items() if values.ndim == 1})
     
     metrics = [
         "sleep_duration_hours", "deep_sleep_minutes", "rem_sleep_minutes",
         "core_sleep_minutes", "daily_steps", "active_calories", "distance_km",
         "respiratory_rate", "spo2", "resting_heart_rate", "hrv_sdnn"
     ]
-    
-    def stats(series):
-        s = series.dropna()
-        if len(s) < 5:
-            return None
-        return {
-            "n": int(len(s)),
-            "mean": float(np.mean(s)),
-            "std": float(np.std(s)),
-            "median": float(np.median(s)),
-            "p5": float(np.percentile(s, 5)),
-            "p10": float(np.percentile(s, 10)),
-            "p25": float(np.percentile(s, 25)),
-            "p75": float(np.percentile(s, 75)),
-            "p90": float(np.percentile(s, 90)),
-            "p95": float(np.percentile(s, 95)),
-            "min": float(np.min(s)),
-            "max": float(np.max(s)),
-        }
+    metrics = [metric for metric in metrics if metric in df.columns]
     
     baselines = {
         "global": {},
@@ -363,57 +453,35 @@ def compute_population_baselines(all_data: list) -> dict:
     }
     
     # Global baselines
-    for metric in metrics:
-        if metric in df.columns:
-            baselines["global"][metric] = stats(df[metric])
-    
-    # By sex
-    for sex in ["male", "female"]:
-        subset = df[df["sex"] == sex]
-        for metric in metrics:
-            if metric in subset.columns:
-                s = stats(subset[metric])
-                if s:
-                    baselines["by_sex"][sex][metric] = s
-    
-    # By age group
-    for age_group in df["age_group"].unique():
-        subset = df[df["age_group"] == age_group]
-        baselines["by_age_group"][age_group] = {}
-        for metric in metrics:
-            if metric in subset.columns:
-                s = stats(subset[metric])
-                if s:
-                    baselines["by_age_group"][age_group][metric] = s
-    
-    # By activity level
-    for level in df["activity_level"].unique():
-        subset = df[df["activity_level"] == level]
-        baselines["by_activity_level"][level] = {}
-        for metric in metrics:
-            if metric in subset.columns:
-                s = stats(subset[metric])
-                if s:
-                    baselines["by_activity_level"][level][metric] = s
-    
-    # Hourly patterns (from hourly_samples)
-    hourly_data = {"heart_rate": {}, "hrv": {}}
-    for record in all_data:
-        for sample in record.get("hourly_samples", []):
-            hour = sample["hour"]
-            for key in ["heart_rate", "hrv"]:
-                if hour not in hourly_data[key]:
-                    hourly_data[key][hour] = []
-                hourly_data[key][hour].append(sample[key])
-    
-    for metric_name, hours_dict in hourly_data.items():
-        baselines["by_hour"][metric_name] = {}
-        for hour, values in hours_dict.items():
-            baselines["by_hour"][metric_name][str(hour)] = stats(pd.Series(values))
+    baselines["global"] = _overall_stats(df[metrics])
+    
+    # By sex, age group and activity level; groups keep first-appearance order
+    for key, column in [("by_sex", "sex"), ("by_age_group", "age_group"), ("by_activity_level", "activity_level")]:
+        for group, group_stats in _grouped_stats(df.groupby(column, sort=False)[metrics]).items():
+            baselines[key][group] = {metric: s for metric, s in group_stats.items() if s}
+    
+    # Hourly patterns: one (metric, hour) column per column of the hourly sample arrays
+    hourly = pd.DataFrame({
+        (metric_name, str(hour)): data[f"hourly_{metric_name}"][:, i]
+        for metric_name in ["heart_rate", "hrv"]
+        for i, hour in enumerate(HOURLY_SAMPLE_HOURS)
+    })
+    for (metric_name, hour), s in _overall_stats(hourly).items():
+        baselines["by_hour"].setdefault(metric_name, {})[hour] = s
     
     return baselines
 
 
+def params_version() -> str:
+    """Short content hash of the generator's parameter tables.
+    
+    Recorded in the baselines output in place of the tables themselves; it
+    changes whenever POPULATION_PARAMS, CIRCADIAN_PATTERNS or DAY_PATTERNS do.
+    """
+    payload = json.dumps([POPULATION_PARAMS, CIRCADIAN_PATTERNS, DAY_PATTERNS], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:12]
+
+
 def main():
     print("=" * 60)
     print("Synthetic HealthKit Data Generator")
@@ -424,6 +492,7 @@ def main():
     num_people = 100
     days_per_person = 30
     start_date = datetime(2024, 1, 1)
+    seed = None  # Set to reproduce the same population
     
     print(f"Generating data for {num_people} virtual people over {days_per_person} days...")
     print()
@@ -431,13 +500,13 @@ def main():
     # Create virtual population
     print("Step 1: Creating virtual population...")
     people = []
+    rng = np.random.default_rng(seed)
     
     # Ensure diversity in age groups
-    age_groups = ["18-29", "30-39", "40-49", "50-59", "60-69", "70+"]
     for i in range(num_people):
-        age_group = age_groups[i % len(age_groups)]
+        age_group = AGE_GROUPS[i % len(AGE_GROUPS)]
         sex = "male" if i % 2 == 0 else "female"
-        person = VirtualPerson(i, age_group=age_group, sex=sex)
+        person = VirtualPerson(i, age_group=age_group, sex=sex, rng=rng)
         people.append(person)
         
     print(f"  Created {len(people)} virtual people")
@@ -445,20 +514,23 @@ def main():
     # Generate data
     print()
     print("Step 2: Generating daily health metrics...")
-    all_data = []
+    person_columns = []
     
     for i, person in enumerate(people):
-        person_data = generate_person_data(person, start_date, days_per_person)
-        all_data.extend(person_data)
+        person_columns.append(generate_person_data(person, start_date, days_per_person))
         if (i + 1) % 20 == 0:
             print(f"  Progress: {i+1}/{num_people} people")
     
-    print(f"  Generated {len(all_data)} daily records")
+    # One array per column across the whole population
+    data = {key: np.concatenate([columns[key] for columns in person_columns]) for key in person_columns[0]}
+    total_records = len(data["date"])
+    
+    print(f"  Generated {total_records} daily records")
     
     # Compute baselines
     print()
     print("Step 3: Computing population baselines...")
-    baselines = compute_population_baselines(all_data)
+    baselines = compute_population_baselines(data)
     
     # Build output
     results = {
@@ -469,9 +541,8 @@ def main():
             "days_per_person": days_per_person,
             "start_date": start_date.strftime("%Y-%m-%d"),
         },
-        "population_params_used": POPULATION_PARAMS,
-        "circadian_patterns_used": CIRCADIAN_PATTERNS,
-        "total_records": len(all_data),
+        "params_version": params_version(),
+        "total_records": total_records,
         "baselines": baselines,
     }
     
@@ -483,10 +554,11 @@ def main():
     with open(baselines_path, "w") as f:
         json.dump(results, f, indent=2)
     
-    # Save raw data for training
+    # Save raw data for training; compact dumps() keeps json on its C encoder
+    # (indent, and json.dump's chunked writes, use the pure-Python one)
     data_path = os.path.join(output_dir, "synthetic_healthkit_data.json")
     with open(data_path, "w") as f:
-        json.dump(all_data, f, indent=2)
+        f.write(json.dumps(columns_to_records(data), separators=(",", ":")))
     
     print()
     print("=" * 60)